@@ -0,0 +1,257 @@
+"""HTTP JSON API cục bộ cho kết quả định giá, dùng chung lõi phân tích với giao diện Streamlit
+
+Endpoint:
+    GET /health
+    GET /valuation/FPT?source=TCBS
+    GET /valuation?symbols=FPT,VNM,HPG&source=VCI
+
+Ví dụ:
+    python api.py --port 8000
+    python api.py --demo        # dữ liệu giả lập, không cần mạng
+"""
+import argparse
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from stock_analyzer import CollectingReporter, StockAnalyzer, valuate
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ('TCBS', 'VCI')
+MAX_BATCH_SYMBOLS = 50
+
+
+class ValuationService:
+    """Định giá theo (mã, nguồn) với bộ nhớ đệm có hạn sử dụng, mỗi khoá chỉ tải dữ liệu một lần"""
+    def __init__(self, data_source=None, ttl=300, workers=8):
+        self.data_source = data_source
+        self.ttl = ttl
+        # Lỗi thường do nguồn dữ liệu chập chờn nên không giữ lâu
+        self.error_ttl = min(ttl, 30)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self._cache = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _compute(self, symbol, source):
+        reporter = CollectingReporter()
+        try:
+            analyzer = StockAnalyzer(symbol, source=source, reporter=reporter, data_source=self.data_source)
+            record = valuate(analyzer)
+            version = analyzer.data_version()
+        except Exception as e:
+            reporter.error(str(e))
+            record = version = None
+
+        if record is None:
+            return {
+                'ok': False,
+                'version': None,
+                'payload': {
+                    'symbol': symbol,
+                    'source': source,
+                    'errors': reporter.errors or ['Dữ liệu không đầy đủ để tính toán'],
+                    'warnings': reporter.warnings,
+                },
+            }
+        return {'ok': True, 'version': version, 'payload': dict(record, data_version=version)}
+
+    def get(self, symbol, source):
+        """Trả về kết quả đã cache nếu còn hạn; các yêu cầu đồng thời cùng khoá chờ một lần tính"""
+        key = (symbol, source)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+            event = self._inflight.get(key)
+            owner = event is None
+            if owner:
+                event = self._inflight[key] = threading.Event()
+
+        if not owner:
+            event.wait()
+            with self._lock:
+                cached = self._cache.get(key)
+            if cached is not None:
+                return cached[1]
+            return self._compute(symbol, source)
+
+        try:
+            entry = self._compute(symbol, source)
+            with self._lock:
+                expires = time.monotonic() + (self.ttl if entry['ok'] else self.error_ttl)
+                self._cache[key] = (expires, entry)
+                self._prune(now)
+            return entry
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+
+    def get_many(self, symbols, source):
+        return list(self.executor.map(lambda symbol: self.get(symbol, source), symbols))
+
+    def _prune(self, now):
+        expired = [key for key, (expires, _) in self._cache.items() if expires <= now]
+        for key in expired:
+            del self._cache[key]
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+def make_etag(versions):
+    return '"' + hashlib.sha1('|'.join(versions).encode()).hexdigest()[:16] + '"'
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # So sánh yếu theo RFC 7232: bỏ tiền tố W/ trước khi so
+    candidates = [tag.strip() for tag in header.split(',')]
+    return any((tag[2:] if tag.startswith('W/') else tag) == etag for tag in candidates)
+
+
+def parse_symbol(raw):
+    """Chuẩn hoá mã, None nếu không phải mã HOSE hợp lệ (2-4 ký tự)"""
+    symbol = raw.strip().upper()
+    if 2 <= len(symbol) <= 4 and symbol.isalnum():
+        return symbol
+    return None
+
+
+class ValuationHandler(BaseHTTPRequestHandler):
+    server_version = 'StockGuruAPI/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        path = url.path.rstrip('/')
+        source = query.get('source', ['TCBS'])[0].upper()
+
+        if path == '/health':
+            return self.send_json(200, {'status': 'ok'})
+        if source not in SOURCES:
+            return self.send_json(400, {'error': f"Nguồn dữ liệu không hợp lệ: {source}"})
+        if path.startswith('/valuation/'):
+            return self.handle_single(path[len('/valuation/'):], source)
+        if path == '/valuation':
+            return self.handle_batch(query.get('symbols', [''])[0], source)
+        return self.send_json(404, {'error': 'Không tìm thấy endpoint'})
+
+    def handle_single(self, raw_symbol, source):
+        symbol = parse_symbol(raw_symbol)
+        if symbol is None:
+            return self.send_json(400, {'error': 'Mã cổ phiếu không hợp lệ (2-4 ký tự)'})
+
+        entry = self.service.get(symbol, source)
+        if not entry['ok']:
+            return self.send_json(404, entry['payload'])
+        self.send_cacheable(entry['payload'], make_etag([entry['version']]))
+
+    def handle_batch(self, raw_symbols, source):
+        symbols = []
+        for raw in raw_symbols.split(','):
+            if not raw.strip():
+                continue
+            symbol = parse_symbol(raw)
+            if symbol is None:
+                return self.send_json(400, {'error': f"Mã cổ phiếu không hợp lệ: {raw.strip()}"})
+            if symbol not in symbols:
+                symbols.append(symbol)
+        if not symbols:
+            return self.send_json(400, {'error': 'Cần tham số symbols, ví dụ ?symbols=FPT,VNM,HPG'})
+        if len(symbols) > MAX_BATCH_SYMBOLS:
+            return self.send_json(400, {'error': f"Tối đa {MAX_BATCH_SYMBOLS} mã mỗi yêu cầu"})
+
+        entries = self.service.get_many(symbols, source)
+        body = {
+            'source': source,
+            'results': [entry['payload'] for entry in entries if entry['ok']],
+            'errors': [entry['payload'] for entry in entries if not entry['ok']],
+        }
+        if body['errors']:
+            # Kết quả thiếu mã lỗi: không gắn ETag để không trả 304 suốt lúc nguồn dữ liệu gián đoạn,
+            # và chỉ cho cache ngắn như lỗi trong ValuationService
+            return self.send_json(200, body, {'Cache-Control': f"public, max-age={self.service.error_ttl}"})
+        versions = [f"{symbol}:{entry['version']}" for symbol, entry in zip(symbols, entries)]
+        self.send_cacheable(body, make_etag(versions))
+
+    def send_cacheable(self, body, etag):
+        headers = {
+            'ETag': etag,
+            'Cache-Control': f"public, max-age={self.service.ttl}",
+        }
+        if etag_matches(self.headers.get('If-None-Match'), etag):
+            return self.send_json(304, None, headers)
+        self.send_json(200, body, headers)
+
+    def send_json(self, status, body, headers=None):
+        data = b'' if body is None else json.dumps(body, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        if body is not None:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        if status >= 400:
+            self.send_header('Cache-Control', 'no-store')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def create_server(host='127.0.0.1', port=8000, service=None):
+    """Tạo server đa luồng; port=0 để hệ điều hành tự chọn cổng trống"""
+    server = ThreadingHTTPServer((host, port), ValuationHandler)
+    server.daemon_threads = True
+    server.service = service if service is not None else ValuationService()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="StockGuru - HTTP JSON API định giá cổ phiếu")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--ttl', type=int, default=300, help="Thời gian giữ kết quả trong bộ nhớ đệm (giây)")
+    parser.add_argument('--workers', type=int, default=8, help="Số mã tải song song cho yêu cầu batch")
+    parser.add_argument('--demo', action='store_true', help="Dùng dữ liệu giả lập thay cho vnstock")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    data_source = None
+    if args.demo:
+        from demo_source import DemoDataSource
+        data_source = DemoDataSource()
+
+    service = ValuationService(data_source=data_source, ttl=args.ttl, workers=args.workers)
+    server = create_server(args.host, args.port, service)
+    logger.info("StockGuru API đang chạy tại http://%s:%d", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""Chạy định giá hàng loạt không cần trình duyệt, xuất từng mã dưới dạng NDJSON/CSV ngay khi hoàn tất
+
+Ví dụ:
+    python batch.py FPT VNM HPG --source VCI -j 4
+    python batch.py --vn30 --format csv -o vn30.csv --errors vn30_errors.ndjson --resume
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from stock_analyzer import VALUATION_FIELDS, VN30_STOCKS, CollectingReporter, StockAnalyzer, valuate
+
+
+def iter_symbols(symbols, skip=()):
+    """Chuẩn hoá mã, bỏ trùng lặp và bỏ các mã đã xử lý xong"""
+    seen = set(skip)
+    for symbol in symbols:
+        symbol = symbol.strip().upper()
+        if symbol and symbol not in seen:
+            seen.add(symbol)
+            yield symbol
+
+
+def analyze_symbol(symbol, source, data_source=None):
+    """Định giá một mã, trả về (bản ghi, None) hoặc (None, bản ghi lỗi)"""
+    reporter = CollectingReporter()
+    try:
+        record = valuate(StockAnalyzer(symbol, source=source, reporter=reporter, data_source=data_source))
+    except Exception as e:
+        reporter.error(str(e))
+        record = None
+
+    if record is None:
+        return None, {
+            'symbol': symbol,
+            'source': source,
+            'errors': reporter.errors or ['Dữ liệu không đầy đủ để tính toán'],
+            'warnings': reporter.warnings,
+        }
+    return record, None
+
+
+def run_pipeline(symbols, source, workers, data_source=None):
+    """Sinh (bản ghi, lỗi) theo thứ tự hoàn thành, giữ tối đa 2 * workers mã đang chạy cùng lúc"""
+    symbols = iter(symbols)
+    max_pending = max(1, workers) * 2
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    completed = False
+    try:
+        pending = set()
+        while True:
+            for symbol in symbols:
+                pending.add(executor.submit(analyze_symbol, symbol, source, data_source))
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                completed = True
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        # Bị ngắt (Ctrl-C) thì không chờ các mã đang tải: kết quả bị bỏ và --resume sẽ chạy lại chúng
+        executor.shutdown(wait=completed, cancel_futures=not completed)
+
+
+class NdjsonWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        self.stream.flush()
+
+
+class CsvWriter:
+    def __init__(self, stream, write_header=True):
+        self.stream = stream
+        self.writer = csv.DictWriter(stream, fieldnames=VALUATION_FIELDS, extrasaction='ignore')
+        if write_header:
+            self.writer.writeheader()
+            self.stream.flush()
+
+    def write(self, record):
+        self.writer.writerow(record)
+        self.stream.flush()
+
+
+def trim_partial_line(path):
+    """Cắt dòng cuối bị ghi dở khi lần chạy trước bị ngắt giữa chừng"""
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+
+def load_done_symbols(path, fmt):
+    """Đọc các mã đã có kết quả trong file đầu ra để bỏ qua khi chạy tiếp"""
+    if not os.path.exists(path):
+        return set()
+
+    trim_partial_line(path)
+    done = set()
+    with open(path, encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                if row.get('symbol'):
+                    done.add(row['symbol'].upper())
+        else:
+            for line in f:
+                try:
+                    done.add(json.loads(line)['symbol'].upper())
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    continue
+    return done
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="StockGuru - định giá cổ phiếu hàng loạt")
+    parser.add_argument('symbols', nargs='*', help="Danh sách mã cổ phiếu (ví dụ: FPT VNM HPG)")
+    parser.add_argument('--vn30', action='store_true', help="Định giá toàn bộ rổ VN30")
+    parser.add_argument('--symbols-file', help="File chứa danh sách mã, mỗi dòng một mã")
+    parser.add_argument('--source', default='TCBS', choices=['TCBS', 'VCI'], help="Nguồn dữ liệu")
+    parser.add_argument('-j', '--workers', type=int, default=4, help="Số mã xử lý song song")
+    parser.add_argument('--format', default='ndjson', choices=['ndjson', 'csv'], help="Định dạng đầu ra")
+    parser.add_argument('-o', '--output', help="File kết quả (mặc định: stdout)")
+    parser.add_argument('--errors', help="File NDJSON ghi lỗi (mặc định: stderr)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Bỏ qua các mã đã có trong file kết quả và ghi tiếp vào cuối file")
+    parser.add_argument('--demo', action='store_true', help="Dùng dữ liệu giả lập thay cho vnstock")
+    return parser
+
+
+def collect_symbols(args):
+    """Gộp mã từ dòng lệnh, file và VN30 dưới dạng generator"""
+    yield from args.symbols
+    if args.symbols_file:
+        with open(args.symbols_file, encoding='utf-8') as f:
+            for line in f:
+                yield line
+    if args.vn30:
+        yield from VN30_STOCKS
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not (args.symbols or args.symbols_file or args.vn30):
+        parser.error("cần ít nhất một mã cổ phiếu, --symbols-file hoặc --vn30")
+    if args.resume and not args.output:
+        parser.error("--resume cần --output")
+
+    data_source = None
+    if args.demo:
+        from demo_source import DemoDataSource
+        data_source = DemoDataSource()
+
+    done = set()
+    append = False
+    if args.resume and os.path.exists(args.output):
+        done = load_done_symbols(args.output, args.format)
+        append = os.path.getsize(args.output) > 0
+
+    out = open(args.output, 'a' if append else 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    err = open(args.errors, 'a', encoding='utf-8') if args.errors else sys.stderr
+    try:
+        writer = CsvWriter(out, write_header=not append) if args.format == 'csv' else NdjsonWriter(out)
+        error_writer = NdjsonWriter(err)
+        failures = 0
+        for record, error in run_pipeline(iter_symbols(collect_symbols(args), skip=done),
+                                          args.source, args.workers, data_source):
+            if error is not None:
+                failures += 1
+                error_writer.write(error)
+            else:
+                writer.write(record)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if err is not sys.stderr:
+            err.close()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    code = main()
+    if code == 130:
+        # Luồng tải dở không thể huỷ và sẽ bị join khi thoát; các file đã đóng nên thoát ngay
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+    sys.exit(code)
@@ -0,0 +1,86 @@
+"""Bộ nhớ đệm trên đĩa cho các bảng tài chính, dùng chung giữa nhiều tiến trình và nhiều lần chạy"""
+import os
+import pickle
+import tempfile
+import time
+
+from stock_analyzer import vnstock_source
+
+FINANCE_TABLES = ('ratio', 'income_statement', 'balance_sheet', 'cash_flow')
+
+
+class CachedFinance:
+    """Bọc stock.finance: đọc bảng từ file pickle nếu còn hạn, ngược lại tải từ nguồn rồi ghi lại"""
+    def __init__(self, stock):
+        self._stock = stock
+
+    def __getattr__(self, name):
+        if name not in FINANCE_TABLES:
+            raise AttributeError(name)
+
+        def load(period='year'):
+            return self._stock.cache.load(self._stock.symbol, self._stock.source, name, period,
+                                          lambda: getattr(self._stock.inner.finance, name)(period=period))
+        return load
+
+
+class CachedStock:
+    """Đối tượng cổ phiếu chỉ khởi tạo nguồn thật khi bộ nhớ đệm không có dữ liệu"""
+    def __init__(self, cache, symbol, source):
+        self.cache = cache
+        self.symbol = symbol
+        self.source = source
+        self._inner = None
+        self.finance = CachedFinance(self)
+
+    @property
+    def inner(self):
+        if self._inner is None:
+            self._inner = self.cache.data_source(self.symbol, self.source)
+        return self._inner
+
+    def __getattr__(self, name):
+        # Các thuộc tính khác (quote, company...) đi thẳng tới nguồn thật
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+
+class CachedDataSource:
+    """Nguồn dữ liệu (symbol, source) -> đối tượng cổ phiếu có cache trên đĩa, có thể pickle để dùng trong process pool"""
+    def __init__(self, data_source=None, cache_dir='.stockguru_cache', max_age=12 * 3600):
+        self.data_source = data_source if data_source is not None else vnstock_source
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+
+    def __call__(self, symbol, source):
+        return CachedStock(self, symbol, source)
+
+    def path(self, symbol, source, table, period):
+        return os.path.join(self.cache_dir, f"{source}_{symbol}_{table}_{period}.pkl")
+
+    def load(self, symbol, source, table, period, fetch):
+        path = self.path(symbol, source, table, period)
+        try:
+            if time.time() - os.path.getmtime(path) < self.max_age:
+                with open(path, 'rb') as f:
+                    return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+        frame = fetch()
+        self.save(path, frame)
+        return frame
+
+    def save(self, path, frame):
+        """Ghi qua file tạm rồi đổi tên để tiến trình khác không đọc phải file ghi dở"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(frame, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
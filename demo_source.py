@@ -0,0 +1,88 @@
+"""Nguồn dữ liệu giả lập, thay cho vnstock khi chạy demo hoặc kiểm thử trên máy cục bộ (không cần mạng)"""
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from stock_analyzer import STOCK_INDUSTRY_MAP, INDUSTRY_PE, INDUSTRY_PB
+
+
+class DemoFinance:
+    """Giả lập stock.finance của vnstock với bảng chỉ số kiểu TCBS (cột đơn giản)"""
+    def __init__(self, symbol, seed, years=5):
+        self.symbol = symbol
+        self.rng = np.random.default_rng(seed)
+        self.years = years
+
+    def ratio(self, period='year'):
+        industry = STOCK_INDUSTRY_MAP.get(self.symbol, 'Khác')
+        # Dao động quanh mức P/E, P/B trung bình ngành để khuyến nghị không bị dồn về một phía
+        pe = INDUSTRY_PE[industry] * self.rng.uniform(0.6, 1.5, self.years)
+        pb = INDUSTRY_PB[industry] * self.rng.uniform(0.6, 1.5, self.years)
+        eps_latest = self.rng.uniform(1000, 8000)
+        growth = self.rng.uniform(-0.05, 0.25, self.years)
+        eps = eps_latest / np.cumprod(np.concatenate([[1.0], 1 + growth[:-1]]))
+        roe = self.rng.uniform(5, 30, self.years)
+        shares = self.rng.uniform(100, 5000) * np.ones(self.years)
+        return pd.DataFrame({
+            'pe': pe,
+            'pb': pb,
+            'eps': eps,
+            'bvps': eps / (roe / 100),
+            'marketCap': pe * eps * shares / 1000,
+            'sharesOutstanding': shares,
+            'roe': roe,
+            'roa': roe * self.rng.uniform(0.2, 0.6, self.years),
+            'grossMargin': self.rng.uniform(10, 45, self.years),
+            'netMargin': self.rng.uniform(3, 25, self.years),
+            'currentRatio': self.rng.uniform(0.8, 2.5, self.years),
+            'debtToEquity': self.rng.uniform(0.2, 2.5, self.years),
+        }, index=pd.Index(range(2024, 2024 - self.years, -1), name='year'))
+
+    def income_statement(self, period='year'):
+        return pd.DataFrame()
+
+    def balance_sheet(self, period='year'):
+        return pd.DataFrame()
+
+    def cash_flow(self, period='year'):
+        return pd.DataFrame()
+
+
+class DemoStock:
+    def __init__(self, symbol, seed):
+        self.symbol = symbol
+        self.finance = DemoFinance(symbol, seed)
+
+
+class DemoDataSource:
+    """Hàm (symbol, source) -> DemoStock, dữ liệu cố định theo mã; tăng version để giả lập dữ liệu mới"""
+    def __init__(self, version=0):
+        self.version = version
+
+    def seed(self, symbol, source):
+        return zlib.crc32(f"{symbol}|{source}|{self.version}".encode())
+
+    def __call__(self, symbol, source):
+        return DemoStock(symbol, self.seed(symbol, source))
+
+
+class DemoPriceFeed:
+    """Giá khớp lệnh giả lập (VND): bước ngẫu nhiên quanh giá P/E * EPS của năm gần nhất"""
+    def __init__(self, data_source=None, volatility=0.02, seed=0):
+        self.data_source = data_source if data_source is not None else DemoDataSource()
+        self.volatility = volatility
+        self.rng = np.random.default_rng(seed)
+        self.prices = {}
+
+    def __call__(self, symbols, source='TCBS'):
+        missing = [symbol for symbol in symbols if symbol not in self.prices]
+        for symbol in missing:
+            latest = self.data_source(symbol, source).finance.ratio().iloc[0]
+            self.prices[symbol] = float(latest['pe'] * latest['eps'])
+
+        steps = np.exp(self.rng.normal(0, self.volatility, len(symbols)))
+        for symbol, step in zip(symbols, steps):
+            # Làm tròn theo bước giá 100 VND như trên HOSE
+            self.prices[symbol] = max(round(self.prices[symbol] * step, -2), 100.0)
+        return {symbol: self.prices[symbol] for symbol in symbols}
@@ -0,0 +1,92 @@
+"""Chuẩn hoá bảng chỉ số tài chính từ nhà cung cấp trước khi phân tích
+
+Mỗi cột được dùng chỉ được ép kiểu một lần sang float64 và các giá trị không hợp lệ (NaN, không phải số, <= 0)
+được che thành NaN theo vector, nên phần tính toán phía sau chỉ cần kiểm tra NaN.
+"""
+import pandas as pd
+
+# Tên cột ứng viên cho từng chỉ số, theo thứ tự ưu tiên
+VCI_COLUMNS = {
+    'pe_ratio': [('Chỉ tiêu định giá', 'P/E'), ('Valuation Ratios', 'P/E')],
+    'pb_ratio': [('Chỉ tiêu định giá', 'P/B'), ('Valuation Ratios', 'P/B')],
+    'eps': [('Chỉ tiêu định giá', 'EPS (VND)'), ('Valuation Ratios', 'EPS (VND)')],
+    'bvps': [('Chỉ tiêu định giá', 'BVPS (VND)'), ('Valuation Ratios', 'BVPS (VND)')],
+    'market_cap': [('Chỉ tiêu định giá', 'Vốn hóa (Tỷ đồng)'), ('Valuation Ratios', 'Market Cap (Bn VND)')],
+    'shares_outstanding': [('Chỉ tiêu định giá', 'Số CP lưu hành (Triệu CP)'),
+                           ('Valuation Ratios', 'Shares Outstanding (Million)')],
+    'roe': [('Chỉ tiêu khả năng sinh lợi', 'ROE (%)'), ('Profitability Ratios', 'ROE (%)')],
+    'roa': [('Chỉ tiêu khả năng sinh lợi', 'ROA (%)'), ('Profitability Ratios', 'ROA (%)')],
+    'gross_margin': [('Chỉ tiêu khả năng sinh lợi', 'Biên lợi nhuận gộp (%)'),
+                     ('Profitability Ratios', 'Gross Margin (%)')],
+    'net_margin': [('Chỉ tiêu khả năng sinh lợi', 'Biên lợi nhuận ròng (%)'),
+                   ('Profitability Ratios', 'Net Profit Margin (%)')],
+    'current_ratio': [('Chỉ tiêu thanh khoản', 'Chỉ số thanh toán hiện thời'), ('Liquidity Ratios', 'Current Ratio')],
+    'debt_to_equity': [('Chỉ tiêu cơ cấu nguồn vốn', 'Nợ/VCSH'), ('Financial Structure Ratios', 'Debt to Equity')],
+}
+
+TCBS_COLUMNS = {
+    'pe_ratio': ['pe', 'priceToEarning', 'P/E'],
+    'pb_ratio': ['pb', 'priceToBook', 'P/B'],
+    'eps': ['eps', 'earningsPerShare', 'EPS'],
+    'bvps': ['bvps', 'bookValuePerShare', 'BVPS'],
+    'market_cap': ['marketCap', 'Vốn hóa (Tỷ đồng)'],
+    'shares_outstanding': ['sharesOutstanding', 'Số CP lưu hành (Triệu CP)'],
+    'roe': ['roe', 'returnOnEquity', 'ROE'],
+    'roa': ['roa', 'returnOnAssets', 'ROA'],
+    'gross_margin': ['grossMargin', 'Biên lợi nhuận gộp'],
+    'net_margin': ['netMargin', 'Biên lợi nhuận ròng'],
+    'current_ratio': ['currentRatio', 'Hệ số thanh toán hiện thời'],
+    'debt_to_equity': ['debtToEquity', 'Nợ/VCSH'],
+}
+
+# Cờ chất lượng dữ liệu cho từng (năm, chỉ số)
+QUALITY_DTYPE = pd.CategoricalDtype(['ok', 'missing', 'non_numeric', 'non_positive'])
+
+
+def ratio_columns(frame):
+    """Các cột ứng viên thực sự có trong bảng cho từng chỉ số (VCI dùng MultiIndex, TCBS cột đơn giản)"""
+    mapping = VCI_COLUMNS if isinstance(frame.columns, pd.MultiIndex) else TCBS_COLUMNS
+    return {metric: [col for col in candidates if col in frame.columns] for metric, candidates in mapping.items()}
+
+
+def ingest_ratios(frame):
+    """Ép kiểu và che giá trị không hợp lệ cho các cột được dùng
+
+    Trả về (bảng đã làm sạch, bảng cờ chất lượng theo năm x chỉ số). Bảng gốc không bị sửa;
+    cột trùng nhãn chỉ giữ lại cột đầu tiên.
+    """
+    if frame is None or frame.empty:
+        return frame, None
+
+    if frame.columns.has_duplicates:
+        # Nhà cung cấp đôi khi trả trùng nhãn cột; giữ cột đầu tiên để frame[col] luôn là Series
+        frame = frame.loc[:, ~frame.columns.duplicated()]
+    frame = frame.copy(deep=False)
+    flags = {}
+    for metric, columns in ratio_columns(frame).items():
+        valid = pd.Series(False, index=frame.index)
+        non_numeric = pd.Series(False, index=frame.index)
+        non_positive = pd.Series(False, index=frame.index)
+        for col in columns:
+            raw = frame[col]
+            numeric = pd.to_numeric(raw, errors='coerce').astype('float64')
+            valid |= numeric > 0
+            non_numeric |= numeric.isna() & raw.notna()
+            non_positive |= numeric <= 0
+            frame[col] = numeric.where(numeric > 0)
+
+        flag = pd.Series('missing', index=frame.index)
+        flag[non_positive.to_numpy()] = 'non_positive'
+        flag[non_numeric.to_numpy()] = 'non_numeric'
+        flag[valid.to_numpy()] = 'ok'
+        flags[metric] = flag.to_numpy()
+
+    return frame, pd.DataFrame(flags, index=frame.index).astype(QUALITY_DTYPE)
+
+
+def quality_summary(quality, year):
+    """Chuỗi gọn các chỉ số có vấn đề của một năm, ví dụ 'roe:non_positive;market_cap:missing'"""
+    if quality is None or year not in quality.index:
+        return ''
+    row = quality.loc[year]
+    return ';'.join(f"{metric}:{flag}" for metric, flag in row.items() if flag != 'ok')
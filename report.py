@@ -0,0 +1,301 @@
+"""Xuất báo cáo HTML tĩnh cho từng mã (bảng phương pháp, biểu đồ P/E, sức khỏe tài chính, kết luận) và trang mục lục
+
+Các báo cáo dùng chung một file plotly-<phiên bản>.min.js trong thư mục đầu ra. Lần chạy sau chỉ dựng lại các mã
+có dữ liệu tài chính thay đổi (so mã băm dữ liệu trong manifest.json).
+
+Ví dụ:
+    python report.py --vn30 -o reports -j 4
+    python report.py FPT VNM --demo --force
+"""
+import argparse
+import html
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from data_cache import CachedDataSource
+from stock_analyzer import (VN30_STOCKS, CollectingReporter, StockAnalyzer, build_conclusion_html,
+                            build_methods_table, build_valuation_record)
+
+MANIFEST = 'manifest.json'
+
+PAGE_CSS = """
+    body { font-family: -apple-system, 'Segoe UI', Roboto, sans-serif; max-width: 1100px; margin: 0 auto; padding: 20px; color: #333; }
+    h1 { color: #0066cc; }
+    table { border-collapse: collapse; width: 100%; margin: 10px 0 20px 0; }
+    th, td { padding: 10px; text-align: center; border-bottom: 1px solid #e6e6e6; }
+    th { background-color: #f0f2f6; }
+    .up { color: #00cc66; }
+    .flat { color: #ff9900; }
+    .down { color: #ff3333; }
+    .stale { color: #999; font-size: 0.85em; }
+    .recommendation-box { padding: 20px; border-radius: 10px; margin: 10px 0; border-left: 4px solid #0066cc; }
+    .strong-buy { background-color: rgba(0, 204, 102, 0.1); border-left-color: #00cc66; }
+    .buy { background-color: rgba(51, 153, 102, 0.1); border-left-color: #339966; }
+    .hold { background-color: rgba(255, 153, 0, 0.1); border-left-color: #ff9900; }
+    .reduce { background-color: rgba(255, 51, 51, 0.1); border-left-color: #ff3333; }
+    .sell { background-color: rgba(204, 0, 0, 0.1); border-left-color: #cc0000; }
+"""
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="vi">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>{css}</style>
+{head}
+</head>
+<body>
+{body}
+<p style="color: #666; font-size: 0.9em;">💡 Kết quả chỉ mang tính tham khảo - Không phải lời khuyên đầu tư</p>
+</body>
+</html>
+"""
+
+
+def premium_class(premium):
+    """Màu chênh lệch theo cùng ngưỡng với bảng trong giao diện Streamlit"""
+    if premium is None:
+        return ''
+    return 'up' if premium > 15 else 'flat' if premium > -5 else 'down'
+
+
+def format_number(value, pattern='{:,.0f}'):
+    return '-' if value is None else pattern.format(value)
+
+
+def render_methods_table(methods_data):
+    fixed = ('Phương pháp', 'Giá trị hợp lý (VND)', 'Chênh lệch (%)')
+    rows = []
+    for row in methods_data:
+        reference = ', '.join(f"{key}: {value}" for key, value in row.items() if key not in fixed)
+        premium = row['Chênh lệch (%)']
+        rows.append(
+            f"<tr><td>{html.escape(row['Phương pháp'])}</td><td>{html.escape(reference)}</td>"
+            f"<td>{format_number(row['Giá trị hợp lý (VND)'])}</td>"
+            f"<td class='{premium_class(premium)}'>{premium:+.1f}%</td></tr>"
+        )
+    return ("<table><tr><th>Phương pháp</th><th>Tham chiếu</th><th>Giá trị hợp lý (VND)</th>"
+            "<th>Chênh lệch (%)</th></tr>" + ''.join(rows) + "</table>")
+
+
+def plotly_js_name():
+    """Tên file plotly.js dùng chung, gắn phiên bản plotly đang cài để nâng cấp không dùng nhầm bản cũ"""
+    import plotly
+
+    return f"plotly-{plotly.__version__}.min.js"
+
+
+def render_symbol_page(analyzer, metrics, valuation):
+    """Dựng HTML báo cáo cho một mã; biểu đồ không nhúng plotly.js mà tham chiếu file dùng chung"""
+    symbol = analyzer.symbol
+    parts = [
+        "<p><a href='index.html'>← Mục lục</a></p>",
+        f"<h1>📊 KẾT QUẢ PHÂN TÍCH CHUYÊN SÂU {html.escape(symbol)}</h1>",
+        f"<p>Nguồn dữ liệu: {html.escape(analyzer.source)} · Năm tài chính: {html.escape(str(metrics['year']))}</p>",
+        "<table><tr><th>Giá hiện tại</th><th>EPS (VND)</th><th>BVPS (VND)</th></tr>"
+        f"<tr><td>{format_number(valuation['current_price'])} VND</td><td>{format_number(metrics['eps'])}</td>"
+        f"<td>{format_number(metrics['bvps'])}</td></tr></table>",
+    ]
+
+    consensus = valuation.get('consensus')
+    if consensus is not None:
+        recommendation, desc, css_class = analyzer.get_recommendation(consensus['premium'])
+        parts.append(
+            f"<div class='recommendation-box {css_class}'><h3 style='margin: 0;'>{recommendation}</h3>"
+            f"<p style='margin: 5px 0 0 0;'>Giá trị hợp lý: <strong>{format_number(consensus['fair_value'])} VND</strong> "
+            f"({consensus['premium']:+.1f}%) - {desc}</p></div>"
+        )
+
+    parts.append("<h2>📈 CHI TIẾT PHƯƠNG PHÁP ĐỊNH GIÁ</h2>")
+    parts.append(render_methods_table(build_methods_table(analyzer, metrics, valuation)))
+
+    parts.append("<h2>🔍 PHÂN TÍCH CHI TIẾT</h2>")
+    for fig in (analyzer.generate_pe_chart(), analyzer.generate_financial_health_chart(metrics)):
+        if fig is not None:
+            parts.append(fig.to_html(full_html=False, include_plotlyjs=False))
+
+    if consensus is not None:
+        parts.append("<h2>🎯 KẾT LUẬN CHUYÊN GIA</h2>")
+        parts.append(build_conclusion_html(symbol, consensus['premium'], metrics, recommendation, desc))
+
+    return PAGE_TEMPLATE.format(
+        title=f"StockGuru - {html.escape(symbol)}",
+        css=PAGE_CSS,
+        head=f"<script src='{plotly_js_name()}'></script>",
+        body='\n'.join(parts),
+    )
+
+
+def write_file(path, content):
+    """Ghi qua file tạm rồi đổi tên để không để lại báo cáo ghi dở khi bị ngắt"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def build_symbol_report(symbol, source, out_dir, data_source, previous_version=None, force=False):
+    """Chạy trong tiến trình con: dựng báo cáo cho một mã, bỏ qua nếu dữ liệu không đổi"""
+    reporter = CollectingReporter()
+    try:
+        analyzer = StockAnalyzer(symbol, source=source, reporter=reporter, data_source=data_source)
+        version = analyzer.data_version()
+        filename = f"{analyzer.symbol}.html"
+        if not force and version == previous_version and os.path.exists(os.path.join(out_dir, filename)):
+            return {'symbol': analyzer.symbol, 'status': 'skipped', 'version': version}
+
+        metrics = analyzer.get_latest_financial_metrics()
+        valuation = analyzer.calculate_fair_value(metrics) if metrics is not None and metrics['eps'] > 0 else None
+        if valuation is not None:
+            page = render_symbol_page(analyzer, metrics, valuation)
+            write_file(os.path.join(out_dir, filename), page)
+            return {
+                'symbol': analyzer.symbol,
+                'status': 'built',
+                'version': version,
+                'file': filename,
+                'record': build_valuation_record(analyzer, metrics, valuation),
+            }
+    except Exception as e:
+        reporter.error(str(e))
+
+    return {
+        'symbol': symbol,
+        'status': 'error',
+        'errors': reporter.errors or ['Dữ liệu không đầy đủ để tính toán'],
+    }
+
+
+def render_index(symbols, entries, errors, source):
+    rows = []
+    for symbol in symbols:
+        entry = entries.get(symbol)
+        if entry is None:
+            continue
+        record = entry['record']
+        premium = record.get('premium')
+        stale = ''
+        if entry.get('failed'):
+            stale = (f" <span class='stale' title='{html.escape('; '.join(entry['failed']), quote=True)}'>"
+                     "⚠️ dữ liệu cũ</span>")
+        rows.append(
+            f"<tr><td><a href='{html.escape(entry['file'])}'>{html.escape(symbol)}</a>{stale}</td>"
+            f"<td>{format_number(record.get('current_price'))}</td><td>{format_number(record.get('fair_value'))}</td>"
+            f"<td class='{premium_class(premium)}'>{format_number(premium, '{:+.1f}%')}</td>"
+            f"<td>{html.escape(record.get('recommendation') or '-')}</td></tr>"
+        )
+    parts = [
+        "<h1>🎯 StockGuru Việt Nam - Báo cáo định giá</h1>",
+        f"<p>Nguồn dữ liệu: {html.escape(source)} · {len(rows)} mã</p>",
+        "<table><tr><th>Mã</th><th>Giá hiện tại (VND)</th><th>Giá trị hợp lý (VND)</th><th>Chênh lệch</th>"
+        "<th>Khuyến nghị</th></tr>" + ''.join(rows) + "</table>",
+    ]
+    if errors:
+        items = ''.join(
+            f"<li><strong>{html.escape(error['symbol'])}</strong>: {html.escape('; '.join(error['errors']))}</li>"
+            for error in errors)
+        parts.append("<h2>⚠️ Không cập nhật được báo cáo</h2>"
+                     "<p class='stale'>Mã đã có báo cáo trước đó vẫn giữ trang cũ, đánh dấu ⚠️ dữ liệu cũ.</p>"
+                     f"<ul>{items}</ul>")
+    return PAGE_TEMPLATE.format(title="StockGuru - Mục lục", css=PAGE_CSS, head='', body='\n'.join(parts))
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def ensure_plotly_js(out_dir, force=False):
+    """Ghi bản plotly.js dùng chung cho mọi báo cáo khi chưa có phiên bản hiện tại hoặc khi force"""
+    path = os.path.join(out_dir, plotly_js_name())
+    if force or not os.path.exists(path):
+        from plotly.offline import get_plotlyjs
+        write_file(path, get_plotlyjs())
+
+
+def build_reports(symbols, source='TCBS', out_dir='reports', data_source=None, workers=None, force=False,
+                  progress=None):
+    """Dựng báo cáo cho danh sách mã trong process pool, trả về dict thống kê built/skipped/error"""
+    symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol.strip()))
+    os.makedirs(out_dir, exist_ok=True)
+    if data_source is None:
+        data_source = CachedDataSource(cache_dir=os.path.join(out_dir, '.cache'))
+
+    manifest = load_manifest(out_dir)
+    entries = manifest.get('symbols', {})
+    plotly_js = plotly_js_name()
+    if manifest.get('plotly_js') != plotly_js:
+        # Plotly đổi phiên bản: dựng lại mọi trang để JSON biểu đồ khớp với bundle mới
+        force = True
+    ensure_plotly_js(out_dir, force=force)
+    stats = {'built': 0, 'skipped': 0, 'error': 0}
+    errors = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(build_symbol_report, symbol, source, out_dir, data_source,
+                            entries.get(symbol, {}).get('version'), force)
+            for symbol in symbols
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            stats[result['status']] += 1
+            entry = entries.get(result['symbol'])
+            if result['status'] == 'built':
+                entries[result['symbol']] = {key: result[key] for key in ('version', 'file', 'record')}
+            elif result['status'] == 'error':
+                errors.append(result)
+                if entry is not None:
+                    # Giữ trang tốt gần nhất, đánh dấu dữ liệu cũ kèm lỗi để mục lục hiển thị
+                    entry['failed'] = result['errors']
+            elif entry is not None:
+                entry.pop('failed', None)
+            if progress is not None:
+                progress(result)
+
+    write_file(os.path.join(out_dir, MANIFEST),
+               json.dumps({'source': source, 'plotly_js': plotly_js, 'symbols': entries},
+                          ensure_ascii=False, indent=2, default=str))
+    write_file(os.path.join(out_dir, 'index.html'), render_index(symbols, entries, errors, source))
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="StockGuru - xuất báo cáo HTML tĩnh")
+    parser.add_argument('symbols', nargs='*', help="Danh sách mã cổ phiếu (ví dụ: FPT VNM HPG)")
+    parser.add_argument('--vn30', action='store_true', help="Xuất báo cáo cho toàn bộ rổ VN30")
+    parser.add_argument('--source', default='TCBS', choices=['TCBS', 'VCI'], help="Nguồn dữ liệu")
+    parser.add_argument('-o', '--output', default='reports', help="Thư mục đầu ra")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Số tiến trình (mặc định: số CPU)")
+    parser.add_argument('--cache-max-age', type=float, default=12 * 3600,
+                        help="Thời gian dùng lại dữ liệu tài chính đã tải (giây)")
+    parser.add_argument('--force', action='store_true', help="Dựng lại tất cả, kể cả mã không đổi dữ liệu")
+    parser.add_argument('--demo', action='store_true', help="Dùng dữ liệu giả lập thay cho vnstock")
+    args = parser.parse_args(argv)
+    symbols = args.symbols + (VN30_STOCKS if args.vn30 else [])
+    if not symbols:
+        parser.error("cần ít nhất một mã cổ phiếu hoặc --vn30")
+
+    inner = None
+    if args.demo:
+        from demo_source import DemoDataSource
+        inner = DemoDataSource()
+    data_source = CachedDataSource(inner, cache_dir=os.path.join(args.output, '.cache'), max_age=args.cache_max_age)
+
+    def progress(result):
+        detail = '; '.join(result.get('errors', []))
+        print(f"{result['symbol']}: {result['status']} {detail}".rstrip(), file=sys.stderr)
+
+    stats = build_reports(symbols, source=args.source, out_dir=args.output, data_source=data_source,
+                          workers=args.workers, force=args.force, progress=progress)
+    print(f"Đã dựng {stats['built']}, bỏ qua {stats['skipped']}, lỗi {stats['error']} - "
+          f"{os.path.join(args.output, 'index.html')}", file=sys.stderr)
+    return 1 if stats['error'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
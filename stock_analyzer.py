@@ -0,0 +1,550 @@
+"""Lõi phân tích & định giá cổ phiếu, dùng chung cho giao diện Streamlit và các công cụ dòng lệnh"""
+import hashlib
+import logging
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from ingest import ingest_ratios, quality_summary, ratio_columns
+
+logger = logging.getLogger(__name__)
+
+
+class LogReporter:
+    """Ghi cảnh báo/lỗi ra logging khi không chạy trong phiên Streamlit"""
+    def warning(self, message):
+        logger.warning(message)
+
+    def error(self, message):
+        logger.error(message)
+
+
+class CollectingReporter:
+    """Gom cảnh báo/lỗi của một mã để trả về cho người gọi thay vì in ra màn hình"""
+    def __init__(self):
+        self.warnings = []
+        self.errors = []
+
+    def warning(self, message):
+        self.warnings.append(message)
+
+    def error(self, message):
+        self.errors.append(message)
+
+
+def vnstock_source(symbol, source):
+    """Nguồn dữ liệu mặc định: đối tượng cổ phiếu của vnstock (có thuộc tính finance)"""
+    from vnstock import Vnstock
+
+    # Khởi tạo đúng cách cho TCBS
+    return Vnstock().stock(symbol=symbol, source=source)
+
+
+# Danh sách cổ phiếu VN30
+VN30_STOCKS = [
+    'VNM', 'VIC', 'FPT', 'VHM', 'HPG', 'TCB', 'MSN', 'VRE', 'MWG', 'BID', 
+    'CTG', 'VCB', 'ACB', 'MBB', 'TPB', 'GAS', 'VJC', 'BVH', 'SSI', 'VIB',
+    'POW', 'PLX', 'NVL', 'KDH', 'HDB', 'PNJ', 'SAB', 'REE', 'VCB', 'VHM'
+]
+
+# Phân loại ngành
+STOCK_INDUSTRY_MAP = {
+    # Ngân hàng
+    'BID': 'Ngân hàng', 'CTG': 'Ngân hàng', 'VCB': 'Ngân hàng', 'ACB': 'Ngân hàng', 'MBB': 'Ngân hàng', 
+    'TPB': 'Ngân hàng', 'VPB': 'Ngân hàng', 'TCB': 'Ngân hàng', 'HDB': 'Ngân hàng', 'STB': 'Ngân hàng', 
+    'VIB': 'Ngân hàng', 'EIB': 'Ngân hàng', 'SHB': 'Ngân hàng', 'LPB': 'Ngân hàng', 'MSB': 'Ngân hàng',
+    # Bất động sản
+    'VIC': 'Bất động sản', 'VHM': 'Bất động sản', 'NVL': 'Bất động sản', 'PDR': 'Bất động sản', 
+    'DXG': 'Bất động sản', 'KDH': 'Bất động sản', 'NLG': 'Bất động sản', 'VRE': 'Bất động sản',
+    # Tiêu dùng
+    'VNM': 'Tiêu dùng', 'MSN': 'Tiêu dùng', 'MWG': 'Tiêu dùng', 'PNJ': 'Tiêu dùng', 'SAB': 'Tiêu dùng', 
+    'HAG': 'Tiêu dùng', 'DGC': 'Tiêu dùng', 'GAS': 'Tiêu dùng', 'REE': 'Tiêu dùng',
+    # Chứng khoán
+    'SSI': 'Chứng khoán', 'VND': 'Chứng khoán', 'HCM': 'Chứng khoán', 'TVS': 'Chứng khoán', 'AGR': 'Chứng khoán',
+    # Công nghiệp
+    'VJC': 'Công nghiệp', 'HVN': 'Công nghiệp', 'FPT': 'Công nghiệp', 'HPG': 'Công nghiệp', 'POW': 'Công nghiệp',
+    # Năng lượng & Nguyên liệu
+    'PLX': 'Năng lượng', 'DPM': 'Nguyên liệu', 'DRC': 'Nguyên liệu', 'BWE': 'Năng lượng', 'PC1': 'Công nghiệp'
+}
+
+# P/E trung bình ngành
+INDUSTRY_PE = {
+    'Ngân hàng': 8.5,
+    'Bất động sản': 6.5,
+    'Tiêu dùng': 20.0,
+    'Chứng khoán': 16.0,
+    'Công nghiệp': 12.0,
+    'Năng lượng': 14.0,
+    'Nguyên liệu': 10.0,
+    'Khác': 15.0
+}
+
+# P/B trung bình ngành
+INDUSTRY_PB = {
+    'Ngân hàng': 1.2,
+    'Bất động sản': 0.9,
+    'Tiêu dùng': 3.5,
+    'Chứng khoán': 2.5,
+    'Công nghiệp': 1.8,
+    'Năng lượng': 1.5,
+    'Nguyên liệu': 1.3,
+    'Khác': 2.0
+}
+
+
+def get_recommendation(premium):
+    """Đưa ra khuyến nghị dựa trên chênh lệch định giá"""
+    if premium > 30:
+        return "STRONG BUY 🚀", "Cổ phiếu đang định giá RẤT THẤP so với giá trị thực", "strong-buy"
+    elif premium > 15:
+        return "BUY 💰", "Cổ phiếu đang định giá THẤP so với giá trị thực", "buy"
+    elif premium > -5:
+        return "HOLD ⚖️", "Cổ phiếu đang định giá HỢP LÝ", "hold"
+    elif premium > -20:
+        return "REDUCE 📉", "Cổ phiếu đang định giá CAO so với giá trị thực", "reduce"
+    else:
+        return "SELL 🔴", "Cổ phiếu đang định giá RẤT CAO so với giá trị thực", "sell"
+
+
+class StockAnalyzer:
+    def __init__(self, symbol, source='TCBS', reporter=None, data_source=None):
+        self.symbol = symbol.upper()
+        self.source = source
+        # Đối tượng có warning()/error(): module streamlit trong UI, LogReporter khi chạy headless
+        self.reporter = reporter if reporter is not None else LogReporter()
+        # Hàm (symbol, source) -> đối tượng cổ phiếu; thay bằng nguồn giả lập khi chạy demo
+        self.data_source = data_source if data_source is not None else vnstock_source
+        self.ratios = None
+        self.income = None
+        self.balance = None
+        self.cashflow = None
+        self.data_quality = None
+        self.load_financial_data()
+    
+    def load_financial_data(self):
+        """Tải dữ liệu tài chính từ nguồn đã chọn (VCI/TCBS)"""
+        try:
+            self.stock_obj = self.data_source(self.symbol, self.source)
+            self.finance = self.stock_obj.finance
+            
+            # Lấy chỉ số tài chính
+            try:
+                self.ratios, self.data_quality = ingest_ratios(self.finance.ratio(period='year'))
+                if self.ratios is not None and not self.ratios.empty:
+                    # Kiểm tra cột P/E để xác định nguồn dữ liệu
+                    if self.source == 'TCBS' and 'pe' not in self.ratios.columns:
+                        self.reporter.warning(f"⚠️ Dữ liệu {self.symbol} có thể không đầy đủ. Thử dùng VCI nếu cần.")
+            except Exception as e:
+                self.reporter.warning(f"⚠️ Không tải được chỉ số tài chính cho {self.symbol}: {str(e)}")
+            
+            # Lấy báo cáo KQKD
+            try:
+                self.income = self.finance.income_statement(period='year')
+            except Exception as e:
+                self.reporter.warning(f"⚠️ Không tải được báo cáo KQKD cho {self.symbol}: {str(e)}")
+            
+            # Lấy báo cáo CĐKT
+            try:
+                self.balance = self.finance.balance_sheet(period='year')
+            except Exception as e:
+                self.reporter.warning(f"⚠️ Không tải được báo cáo CĐKT cho {self.symbol}: {str(e)}")
+            
+            # Lấy báo cáo LCTT
+            try:
+                self.cashflow = self.finance.cash_flow(period='year')
+            except Exception as e:
+                self.reporter.warning(f"⚠️ Không tải được báo cáo LCTT cho {self.symbol}: {str(e)}")
+                
+        except Exception as e:
+            self.reporter.error(f"❌ Lỗi khi kết nối dữ liệu {self.source}: {str(e)}")
+    
+    def get_latest_financial_metrics(self):
+        """Lấy các chỉ số tài chính quan trọng nhất với xử lý đa nguồn dữ liệu"""
+        if self.ratios is None or self.ratios.empty:
+            self.reporter.error("❌ Không tải được dữ liệu tài chính")
+            return None
+        
+        try:
+            # Lấy năm mới nhất
+            latest_year = self.ratios.index[0]
+            
+            # Xác định nguồn dữ liệu (VCI vs TCBS)
+            is_vci = isinstance(self.ratios.columns, pd.MultiIndex)
+            
+            # Các cột đã được ép kiểu float và che giá trị không hợp lệ khi nạp (xem ingest.py)
+            columns = ratio_columns(self.ratios)
+            
+            def safe_get_value(metric):
+                """Lấy giá trị hợp lệ đầu tiên trong các cột ứng viên của chỉ số"""
+                for key in columns[metric]:
+                    # Đọc theo cột float, không dựng cả dòng kiểu object
+                    value = self.ratios[key].iat[0]
+                    if pd.notna(value):
+                        return float(value)
+                return None
+            
+            # Trích xuất các chỉ số quan trọng
+            pe_ratio = safe_get_value('pe_ratio')
+            pb_ratio = safe_get_value('pb_ratio')
+            eps = safe_get_value('eps')
+            bvps = safe_get_value('bvps')
+            market_cap = safe_get_value('market_cap')
+            shares_outstanding = safe_get_value('shares_outstanding')
+            
+            roe = safe_get_value('roe')
+            roa = safe_get_value('roa')
+            gross_margin = safe_get_value('gross_margin')
+            net_margin = safe_get_value('net_margin')
+            current_ratio = safe_get_value('current_ratio')
+            debt_to_equity = safe_get_value('debt_to_equity')
+            
+            # Chuyển đổi đơn vị (nếu cần)
+            if eps is not None and is_vci:
+                eps = eps * 1000  # Chuyển từ nghìn đồng → VND
+            if bvps is not None and is_vci:
+                bvps = bvps * 1000  # Chuyển từ nghìn đồng → VND
+            
+            # Tính toán EPS CAGR (nếu có dữ liệu)
+            eps_cagr = 0
+            if eps is not None and columns['eps']:
+                eps_values = self.ratios[columns['eps'][0]].to_numpy()[:3]
+                # NaN (giá trị không hợp lệ đã bị che) luôn cho kết quả so sánh False
+                if len(eps_values) >= 3 and eps_values[0] > 0 and eps_values[2] > 0:
+                    eps_cagr = (eps_values[0] / eps_values[2]) ** (1/2) - 1
+            
+            # Validate dữ liệu
+            if eps is None or bvps is None or pe_ratio is None or pb_ratio is None:
+                self.reporter.error("❌ Dữ liệu không đầy đủ để tính toán")
+                return None
+            
+            return {
+                'year': latest_year,
+                'pe_ratio': pe_ratio,
+                'pb_ratio': pb_ratio,
+                'eps': eps,
+                'bvps': bvps,
+                'market_cap': market_cap,
+                'shares_outstanding': shares_outstanding,
+                'roe': roe,
+                'roa': roa,
+                'gross_margin': gross_margin,
+                'net_margin': net_margin,
+                'current_ratio': current_ratio,
+                'debt_to_equity': debt_to_equity,
+                'eps_cagr': eps_cagr * 100
+            }
+            
+        except Exception as e:
+            self.reporter.error(f"❌ Lỗi khi xử lý dữ liệu tài chính: {str(e)}")
+            return None
+    
+    def data_version(self):
+        """Mã băm nội dung các bảng tài chính, đổi khi dữ liệu nguồn thay đổi"""
+        digest = hashlib.sha1(f"{self.symbol}|{self.source}".encode())
+        for frame in (self.ratios, self.income, self.balance, self.cashflow):
+            if frame is None:
+                digest.update(b'-')
+                continue
+            digest.update(repr(list(frame.columns)).encode())
+            digest.update(pd.util.hash_pandas_object(frame, index=True).values.tobytes())
+        return digest.hexdigest()[:16]
+
+    def get_industry_pe(self):
+        """Lấy P/E trung bình ngành phù hợp với cổ phiếu"""
+        industry = STOCK_INDUSTRY_MAP.get(self.symbol, 'Khác')
+        return INDUSTRY_PE.get(industry, 15.0)
+    
+    def get_industry_pb(self):
+        """Lấy P/B trung bình ngành"""
+        industry = STOCK_INDUSTRY_MAP.get(self.symbol, 'Khác')
+        return INDUSTRY_PB.get(industry, 2.0)
+    
+    def calculate_fair_value(self, metrics):
+        """Tính giá trị hợp lý bằng nhiều phương pháp"""
+        if metrics is None:
+            return None
+        
+        try:
+            current_price = metrics['pe_ratio'] * metrics['eps']
+            results = {
+                'current_price': current_price,
+                'methods': {},
+                'premiums': {}
+            }
+            
+            # 1. P/E so sánh ngành
+            industry_pe_avg = self.get_industry_pe()
+            pe_fair = metrics['eps'] * industry_pe_avg
+            results['methods']['pe_industry'] = pe_fair
+            results['premiums']['pe_industry'] = (pe_fair - current_price) / current_price * 100
+            
+            # 2. P/B so sánh ngành
+            industry_pb_avg = self.get_industry_pb()
+            pb_fair = metrics['bvps'] * industry_pb_avg
+            results['methods']['pb_industry'] = pb_fair
+            results['premiums']['pb_industry'] = (pb_fair - current_price) / current_price * 100
+            
+            # 3. PEG Ratio
+            eps_growth = metrics['eps_cagr']
+            if eps_growth > 0:
+                peg_ratio = 1.0  # PEG hợp lý
+                growth_pe = eps_growth * peg_ratio
+                peg_fair = metrics['eps'] * growth_pe
+                results['methods']['peg'] = peg_fair
+                results['premiums']['peg'] = (peg_fair - current_price) / current_price * 100
+            
+            # 4. ROE-based valuation
+            roe = metrics['roe']
+            if roe is not None and roe > 0:
+                if roe > 15:
+                    roe_pe = 15 + (roe - 15) * 0.5
+                else:
+                    roe_pe = roe * 1.2
+                roe_fair = metrics['eps'] * roe_pe
+                results['methods']['roe_based'] = roe_fair
+                results['premiums']['roe_based'] = (roe_fair - current_price) / current_price * 100
+            
+            # 5. Tính fair value tổng hợp
+            valid_methods = []
+            weights = {
+                'pe_industry': 0.4,
+                'pb_industry': 0.3,
+                'peg': 0.2,
+                'roe_based': 0.1
+            }
+            
+            for method in weights.keys():
+                if method in results['methods'] and results['methods'][method] > 0:
+                    valid_methods.append(method)
+            
+            if valid_methods:
+                weighted_sum = 0
+                total_weight = 0
+                
+                for method in valid_methods:
+                    value = results['methods'][method]
+                    weight = weights[method]
+                    weighted_sum += value * weight
+                    total_weight += weight
+                
+                if total_weight > 0:
+                    fair_value = weighted_sum / total_weight
+                    premium = (fair_value - current_price) / current_price * 100
+                    results['consensus'] = {
+                        'fair_value': fair_value,
+                        'premium': premium
+                    }
+            
+            return results
+            
+        except Exception as e:
+            self.reporter.error(f"❌ Lỗi trong quá trình tính toán định giá: {str(e)}")
+            return None
+    
+    def get_recommendation(self, premium):
+        """Đưa ra khuyến nghị dựa trên chênh lệch định giá"""
+        return get_recommendation(premium)
+    
+    def pe_history(self, years=5):
+        """Các giá trị P/E hợp lệ của những năm gần nhất (đã bỏ NaN/<= 0)"""
+        if self.ratios is None or self.ratios.empty:
+            return np.array([])
+        pe_cols = ratio_columns(self.ratios)['pe_ratio']
+        if not pe_cols:
+            return np.array([])
+        values = self.ratios[pe_cols[0]].to_numpy()[:years]
+        return values[~np.isnan(values)]
+    
+    def generate_pe_chart(self):
+        """Tạo biểu đồ P/E lịch sử"""
+        if self.ratios is None or self.ratios.empty:
+            return None
+        
+        try:
+            # Xác định tên cột P/E
+            pe_cols = ratio_columns(self.ratios)['pe_ratio']
+            if not pe_cols:
+                return None
+            
+            # Lấy 5 năm gần nhất (giá trị không hợp lệ đã là NaN sau khi nạp)
+            years = self.ratios.index.tolist()[:5]
+            pe_values = self.ratios[pe_cols[0]].iloc[:5].fillna(0).tolist()
+            
+            # Tạo DataFrame cho biểu đồ
+            df = pd.DataFrame({
+                'Năm': years,
+                'P/E': pe_values
+            })
+            
+            # Chỉ vẽ biểu đồ nếu có dữ liệu hợp lệ
+            if sum(pe_values) > 0:
+                fig = px.line(df, x='Năm', y='P/E', markers=True, 
+                              title=f'P/E lịch sử {self.symbol}',
+                              line_shape='spline')
+                fig.update_traces(line=dict(width=3, color='#0066cc'), 
+                                  marker=dict(size=10, color='#ff6600'))
+                fig.update_layout(
+                    plot_bgcolor='white',
+                    xaxis_title='Năm',
+                    yaxis_title='P/E Ratio',
+                    hovermode='x unified'
+                )
+                return fig
+            return None
+            
+        except Exception as e:
+            self.reporter.warning(f"⚠️ Không thể tạo biểu đồ P/E: {str(e)}")
+            return None
+    
+    def generate_financial_health_chart(self, metrics):
+        """Tạo biểu đồ sức khỏe tài chính"""
+        if metrics is None:
+            return None
+        
+        try:
+            categories = ['ROE (%)', 'Margin (%)', 'Thanh khoản', 'Đòn bẩy']
+            values = [
+                min(metrics['roe'] / 25 * 100, 100) if metrics['roe'] is not None else 0,
+                min(metrics['net_margin'] * 3, 100) if metrics['net_margin'] is not None else 0,
+                min(metrics['current_ratio'] * 33, 100) if metrics['current_ratio'] is not None else 0,
+                max(100 - metrics['debt_to_equity'] * 25, 0) if metrics['debt_to_equity'] is not None else 0
+            ]
+            
+            colors = ['#00cc66' if v > 70 else '#ff9900' if v > 40 else '#ff3333' for v in values]
+            
+            fig = px.bar(
+                x=categories,
+                y=values,
+                title="Sức khỏe tài chính tổng thể",
+                labels={'x': 'Chỉ số', 'y': 'Điểm (0-100)'}
+            )
+            
+            fig.update_traces(
+                marker_color=colors,
+                text=[f"{v:.0f}" for v in values],
+                textposition='outside'
+            )
+            
+            fig.update_layout(
+                plot_bgcolor='white',
+                yaxis_range=[0, 110],
+                showlegend=False
+            )
+            
+            return fig
+        except Exception as e:
+            self.reporter.warning(f"⚠️ Không thể tạo biểu đồ sức khỏe tài chính: {str(e)}")
+            return None
+
+
+def build_methods_table(analyzer, metrics, valuation):
+    """Bảng chi tiết các phương pháp định giá (mỗi phương pháp một dòng)"""
+    methods_data = []
+    if 'pe_industry' in valuation['methods']:
+        methods_data.append({
+            'Phương pháp': 'P/E ngành',
+            'P/E tham chiếu': f"{analyzer.get_industry_pe():.1f}x",
+            'Giá trị hợp lý (VND)': valuation['methods']['pe_industry'],
+            'Chênh lệch (%)': valuation['premiums']['pe_industry']
+        })
+
+    if 'pb_industry' in valuation['methods']:
+        methods_data.append({
+            'Phương pháp': 'P/B ngành',
+            'P/B tham chiếu': f"{analyzer.get_industry_pb():.1f}x",
+            'Giá trị hợp lý (VND)': valuation['methods']['pb_industry'],
+            'Chênh lệch (%)': valuation['premiums']['pb_industry']
+        })
+
+    if 'peg' in valuation['methods']:
+        methods_data.append({
+            'Phương pháp': 'PEG Ratio',
+            'Tăng trưởng EPS': f"{metrics['eps_cagr']:.1f}%",
+            'Giá trị hợp lý (VND)': valuation['methods']['peg'],
+            'Chênh lệch (%)': valuation['premiums']['peg']
+        })
+
+    if 'roe_based' in valuation['methods']:
+        methods_data.append({
+            'Phương pháp': 'ROE-based',
+            'ROE': f"{metrics['roe']:.1f}%",
+            'Giá trị hợp lý (VND)': valuation['methods']['roe_based'],
+            'Chênh lệch (%)': valuation['premiums']['roe_based']
+        })
+
+    return methods_data
+
+
+def build_conclusion_html(symbol, premium, metrics, recommendation, desc):
+    """Đoạn HTML 'Kết luận chuyên gia' cho một mã (chỉ số thiếu, ví dụ thanh khoản của ngân hàng, hiện N/A)"""
+    def fmt(key, pattern):
+        return 'N/A' if metrics[key] is None else pattern.format(metrics[key])
+
+    roe = metrics['roe']
+    current_ratio = metrics['current_ratio']
+    is_healthy = roe is not None and roe > 15 and current_ratio is not None and current_ratio > 1.5
+    conclusion = f"""
+    <div style='background-color: #f8f9fa; padding: 20px; border-radius: 10px; border-left: 4px solid #0066cc;'>
+        <p style='font-size: 1.1em; line-height: 1.6;'>
+            <strong>{symbol.upper()}</strong> hiện đang được định giá ở mức <strong>{premium:+.1f}%</strong> so với giá trị hợp lý được tính toán từ 4 phương pháp định giá khác nhau.
+        </p>
+
+        <p style='font-size: 1.1em; line-height: 1.6;'>
+            Với <strong>ROE {fmt('roe', '{:.1f}%')}</strong> và <strong>tăng trưởng EPS {metrics['eps_cagr']:.1f}%</strong> trong 3 năm qua, công ty thể hiện khả năng sinh lời tốt. Sức khỏe tài chính được đánh giá là 
+            <strong>{'TỐT' if is_healthy else 'TRUNG BÌNH'}</strong> với hệ số thanh khoản hiện tại {fmt('current_ratio', '{:.2f}')} và tỷ lệ nợ/vốn chủ sở hữu {fmt('debt_to_equity', '{:.2f}')}.
+        </p>
+
+        <p style='font-size: 1.1em; line-height: 1.6;'>
+            <strong>Khuyến nghị đầu tư:</strong> {recommendation} - {desc}
+        </p>
+    </div>
+    """
+    return conclusion
+
+
+# Các trường của một bản ghi định giá (thứ tự cột khi xuất CSV)
+VALUATION_FIELDS = [
+    'symbol', 'source', 'year', 'current_price', 'fair_value', 'premium',
+    'recommendation', 'signal', 'pe_industry', 'pb_industry', 'peg', 'roe_based', 'data_quality'
+]
+
+
+def valuate(analyzer):
+    """Chạy toàn bộ quy trình định giá, trả về bản ghi phẳng hoặc None nếu thiếu dữ liệu"""
+    metrics = analyzer.get_latest_financial_metrics()
+    if metrics is None or metrics['eps'] <= 0:
+        return None
+
+    valuation = analyzer.calculate_fair_value(metrics)
+    if valuation is None:
+        return None
+    return build_valuation_record(analyzer, metrics, valuation)
+
+
+def build_valuation_record(analyzer, metrics, valuation):
+    """Làm phẳng kết quả calculate_fair_value thành bản ghi theo VALUATION_FIELDS"""
+    year = metrics['year']
+    record = {
+        'symbol': analyzer.symbol,
+        'source': analyzer.source,
+        'year': year.item() if hasattr(year, 'item') else year,
+        'current_price': valuation['current_price'],
+        'fair_value': None,
+        'premium': None,
+        'recommendation': None,
+        'signal': None,
+    }
+    if 'consensus' in valuation:
+        premium = valuation['consensus']['premium']
+        recommendation, _, signal = analyzer.get_recommendation(premium)
+        record.update({
+            'fair_value': valuation['consensus']['fair_value'],
+            'premium': premium,
+            'recommendation': recommendation,
+            'signal': signal,
+        })
+    for method in ('pe_industry', 'pb_industry', 'peg', 'roe_based'):
+        record[method] = valuation['methods'].get(method)
+    record['data_quality'] = quality_summary(analyzer.data_quality, metrics['year'])
+    return record
@@ -0,0 +1,122 @@
+"""Kiểm thử HTTP API trên localhost với nguồn dữ liệu giả lập"""
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from api import ValuationService, create_server
+from demo_source import DemoDataSource
+
+
+class CountingSource:
+    """Bọc DemoDataSource, đếm số lần tải dữ liệu và cho phép giả lập mã bị lỗi"""
+    def __init__(self, failing=()):
+        self.inner = DemoDataSource()
+        self.failing = set(failing)
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, symbol, source):
+        with self.lock:
+            self.calls[symbol] = self.calls.get(symbol, 0) + 1
+        if symbol in self.failing:
+            raise RuntimeError("nguồn dữ liệu gián đoạn")
+        return self.inner(symbol, source)
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(data_source=None):
+        service = ValuationService(data_source=data_source or DemoDataSource(), ttl=60)
+        server = create_server(port=0, service=service)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+        server.service.close()
+
+
+def get(url, headers=None):
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_single_symbol(serve):
+    base = serve()
+    status, headers, body = get(f"{base}/valuation/fpt")
+    data = json.loads(body)
+    assert status == 200
+    assert data['symbol'] == 'FPT'
+    assert data['fair_value'] > 0
+    assert headers['ETag']
+    assert headers['Cache-Control'] == 'public, max-age=60'
+
+
+def test_batch(serve):
+    base = serve()
+    status, _, body = get(f"{base}/valuation?symbols=FPT,VNM,hpg,FPT")
+    data = json.loads(body)
+    assert status == 200
+    assert sorted(record['symbol'] for record in data['results']) == ['FPT', 'HPG', 'VNM']
+    assert data['errors'] == []
+
+
+@pytest.mark.parametrize('path', [
+    '/valuation/TOOLONG',
+    '/valuation/FPT?source=XYZ',
+    '/valuation?symbols=FPT,X',
+    '/valuation',
+])
+def test_bad_request(serve, path):
+    assert get(serve() + path)[0] == 400
+
+
+@pytest.mark.parametrize('path', ['/valuation/FPT', '/valuation?symbols=FPT,VNM'])
+def test_if_none_match_returns_304(serve, path):
+    base = serve()
+    _, headers, _ = get(base + path)
+    status, headers_304, body = get(base + path, {'If-None-Match': headers['ETag']})
+    assert status == 304
+    assert body == b''
+    assert headers_304['ETag'] == headers['ETag']
+
+
+def test_concurrent_requests_load_once(serve):
+    source = CountingSource()
+    base = serve(source)
+    threads = [threading.Thread(target=get, args=(f"{base}/valuation?symbols=FPT,VNM,HPG",)) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert source.calls == {'FPT': 1, 'VNM': 1, 'HPG': 1}
+
+
+def test_partial_batch_has_no_etag(serve):
+    base = serve(CountingSource(failing={'VNM'}))
+    status, headers, body = get(f"{base}/valuation?symbols=FPT,VNM")
+    data = json.loads(body)
+    assert status == 200
+    assert [record['symbol'] for record in data['results']] == ['FPT']
+    assert [error['symbol'] for error in data['errors']] == ['VNM']
+    assert headers['ETag'] is None
+    assert headers['Cache-Control'] == 'public, max-age=30'
+
+
+def test_failed_single_symbol_is_not_cacheable(serve):
+    base = serve(CountingSource(failing={'VNM'}))
+    status, headers, _ = get(f"{base}/valuation/VNM")
+    assert status == 404
+    assert headers['Cache-Control'] == 'no-store'
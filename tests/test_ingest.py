@@ -0,0 +1,24 @@
+import pandas as pd
+
+from ingest import ingest_ratios
+
+
+def test_duplicate_tcbs_columns_keep_first():
+    frame = pd.DataFrame([[12.0, 'x', 1500.0], [10.0, 9.0, -1.0]],
+                         columns=['pe', 'pe', 'eps'], index=pd.Index([2024, 2023], name='year'))
+    ratios, quality = ingest_ratios(frame)
+    assert list(ratios.columns) == ['pe', 'eps']
+    assert ratios['pe'].tolist() == [12.0, 10.0]
+    assert quality.loc[2023, 'eps'] == 'non_positive'
+    assert frame.shape == (2, 3)
+
+
+def test_duplicate_vci_columns_keep_first():
+    columns = pd.MultiIndex.from_tuples([
+        ('Chỉ tiêu định giá', 'P/E'), ('Chỉ tiêu định giá', 'P/E'), ('Chỉ tiêu khả năng sinh lợi', 'ROE (%)'),
+    ])
+    frame = pd.DataFrame([['15.5', '99', 20.0]], columns=columns, index=pd.Index([2024], name='year'))
+    ratios, quality = ingest_ratios(frame)
+    assert ratios[('Chỉ tiêu định giá', 'P/E')].iat[0] == 15.5
+    assert quality.loc[2024, 'pe_ratio'] == 'ok'
+    assert quality.loc[2024, 'pb_ratio'] == 'missing'
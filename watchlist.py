@@ -0,0 +1,415 @@
+"""Theo dõi danh mục: giữ giá trị hợp lý trong bộ nhớ, chỉ cập nhật giá khớp lệnh theo chu kỳ
+
+Giá trị hợp lý của cả 4 phương pháp chỉ phụ thuộc EPS/BVPS/ROE (báo cáo năm) nên được tính một lần
+và làm mới thưa. Mỗi nhịp chỉ lấy giá mới nhất rồi tính lại chênh lệch và khuyến nghị, O(1) mỗi mã.
+
+Ví dụ:
+    python watchlist.py FPT VNM HPG --interval 60
+    python watchlist.py --vn30 --demo --interval 2
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, timedelta
+
+from stock_analyzer import CollectingReporter, StockAnalyzer, VN30_STOCKS, get_recommendation, vnstock_source
+
+logger = logging.getLogger(__name__)
+
+
+def vnstock_price_board(symbols, source):
+    """Bảng giá trực tuyến của vnstock cho cả danh sách mã trong một request"""
+    from vnstock import Trading
+
+    return Trading(source=source).price_board(symbols_list=list(symbols))
+
+
+def parse_price_board(board):
+    """Lấy {mã: giá khớp} từ bảng giá; cột có thể là MultiIndex (('listing', 'symbol'), ('match', 'match_price'))"""
+    if board is None or board.empty:
+        return {}
+    names = [col[-1] if isinstance(col, tuple) else col for col in board.columns]
+    symbol_idx = next((names.index(name) for name in ('symbol', 'ticker') if name in names), None)
+    price_idx = next((names.index(name) for name in ('match_price', 'price', 'close_price', 'last_price')
+                      if name in names), None)
+    if symbol_idx is None or price_idx is None:
+        return {}
+    prices = {}
+    for symbol, price in zip(board.iloc[:, symbol_idx], board.iloc[:, price_idx]):
+        try:
+            price = float(price)
+        except (TypeError, ValueError):
+            continue
+        if price > 0:
+            prices[str(symbol).upper()] = price
+    return prices
+
+
+class VnstockPriceFeed:
+    """Lấy giá khớp lệnh mới nhất cho cả danh mục qua bảng giá vnstock, mỗi lô batch_size mã một request
+
+    Mã không có trên bảng giá (hoặc khi bảng giá lỗi) mới được lấy riêng qua quote.history; mã vẫn không có giá
+    bị tạm bỏ qua ở bước này retry_delay giây, tăng gấp đôi mỗi lần lỗi (tối đa max_retry_delay).
+    Bảng giá trả VND (board_unit=1), quote.history trả nghìn đồng (price_unit=1000) để cùng đơn vị với EPS.
+    """
+    def __init__(self, data_source=None, price_board=None, board_unit=1, price_unit=1000, workers=8,
+                 lookback_days=10, batch_size=100, retry_delay=60, max_retry_delay=3600):
+        self.data_source = data_source if data_source is not None else vnstock_source
+        self.price_board = price_board if price_board is not None else vnstock_price_board
+        self.board_unit = board_unit
+        self.price_unit = price_unit
+        self.lookback_days = lookback_days
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self._stocks = {}
+        self._failures = {}
+        self._closed = threading.Event()
+
+    def _board_prices(self, symbols, source):
+        prices = {}
+        for start in range(0, len(symbols), self.batch_size):
+            chunk = symbols[start:start + self.batch_size]
+            try:
+                board = parse_price_board(self.price_board(chunk, source))
+            except Exception as e:
+                logger.warning("Không lấy được bảng giá (%d mã): %s", len(chunk), e)
+                continue
+            prices.update({symbol: price * self.board_unit for symbol, price in board.items()})
+        return prices
+
+    def _latest_price(self, symbol, source):
+        stock = self._stocks.get((symbol, source))
+        if stock is None:
+            stock = self._stocks[(symbol, source)] = self.data_source(symbol, source)
+        end = date.today()
+        history = stock.quote.history(start=(end - timedelta(days=self.lookback_days)).isoformat(),
+                                      end=end.isoformat(), interval='1D')
+        if history is None or history.empty:
+            return None
+        return float(history['close'].iloc[-1]) * self.price_unit
+
+    def _history_prices(self, symbols, source):
+        def fetch(symbol):
+            try:
+                return self._latest_price(symbol, source)
+            except Exception as e:
+                logger.warning("Không lấy được giá %s: %s", symbol, e)
+                return None
+
+        futures = {self.executor.submit(fetch, symbol): symbol for symbol in symbols}
+        prices = {}
+        pending = set(futures)
+        # Chờ theo từng quãng ngắn để close() không phải đợi các request đang treo
+        while pending and not self._closed.is_set():
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                prices[futures[future]] = future.result()
+        return prices
+
+    def _record_failure(self, symbol, now):
+        attempts = self._failures.get(symbol, (0, 0))[1] + 1
+        delay = min(self.retry_delay * 2 ** (attempts - 1), self.max_retry_delay)
+        self._failures[symbol] = (now + delay, attempts)
+
+    def __call__(self, symbols, source='TCBS'):
+        symbols = list(symbols)
+        prices = self._board_prices(symbols, source)
+
+        now = time.time()
+        missing = [symbol for symbol in symbols
+                   if symbol not in prices and self._failures.get(symbol, (0, 0))[0] <= now]
+        if missing and not self._closed.is_set():
+            prices.update(self._history_prices(missing, source))
+
+        for symbol in symbols:
+            if prices.get(symbol) is not None:
+                self._failures.pop(symbol, None)
+            elif symbol in missing:
+                self._record_failure(symbol, now)
+        return {symbol: prices.get(symbol) for symbol in symbols}
+
+    def close(self):
+        self._closed.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class WatchState:
+    """Trạng thái một mã trong danh mục theo dõi"""
+    __slots__ = ('symbol', 'fair_value', 'methods', 'data_version', 'loaded_at', 'expires_at',
+                 'price', 'premium', 'signal', 'recommendation', 'updated_at', 'pending_signal', 'pending_ticks')
+
+    def __init__(self, symbol, fair_value, methods, data_version, loaded_at, expires_at):
+        self.symbol = symbol
+        self.fair_value = fair_value
+        self.methods = methods
+        self.data_version = data_version
+        self.loaded_at = loaded_at
+        self.expires_at = expires_at
+        self.price = None
+        self.premium = None
+        self.signal = None
+        self.recommendation = None
+        self.updated_at = None
+        self.pending_signal = None
+        self.pending_ticks = 0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class WatchlistMonitor:
+    """Làm mới giá theo chu kỳ trong luồng nền và phát cảnh báo khi mã đổi nhóm khuyến nghị
+
+    on_alert nhận dict gồm symbol, previous, current, price, premium, fair_value.
+    Giá trị hợp lý được tải song song trên một luồng riêng nên không chặn nhịp lấy giá; mã tải lỗi
+    được thử lại sau retry_delay giây, tăng gấp đôi mỗi lần lỗi (tối đa fair_value_ttl).
+    Chỉ đổi nhóm khi chênh lệch vượt ngưỡng ít nhất hysteresis điểm % và giữ ở nhóm mới confirm_ticks nhịp
+    liên tiếp, để giá dao động quanh ngưỡng không gây cảnh báo qua lại.
+    """
+    def __init__(self, symbols, source='TCBS', price_feed=None, data_source=None,
+                 interval=60, fair_value_ttl=6 * 3600, on_alert=None, workers=8, retry_delay=60,
+                 hysteresis=1.0, confirm_ticks=2):
+        self.symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols))
+        self.source = source
+        self.data_source = data_source
+        self.price_feed = price_feed if price_feed is not None else VnstockPriceFeed(data_source)
+        self.interval = interval
+        self.fair_value_ttl = fair_value_ttl
+        self.on_alert = on_alert
+        self.retry_delay = retry_delay
+        self.hysteresis = hysteresis
+        self.confirm_ticks = confirm_ticks
+        self.states = {}
+        self.errors = {}
+        self._failures = {}
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def load_components(self, symbol):
+        """Tính giá trị hợp lý (không phụ thuộc giá) cho một mã, None nếu thiếu dữ liệu"""
+        reporter = CollectingReporter()
+        analyzer = StockAnalyzer(symbol, source=self.source, reporter=reporter, data_source=self.data_source)
+        metrics = analyzer.get_latest_financial_metrics()
+        valuation = analyzer.calculate_fair_value(metrics) if metrics is not None and metrics['eps'] > 0 else None
+        if valuation is None or 'consensus' not in valuation:
+            self.errors[symbol] = reporter.errors or ['Dữ liệu không đầy đủ để tính toán']
+            return None
+
+        self.errors.pop(symbol, None)
+        now = time.time()
+        # Rải thời điểm hết hạn để các mã không cùng tải lại một lúc
+        expires_at = now + self.fair_value_ttl * random.uniform(0.9, 1.1)
+        return WatchState(symbol, valuation['consensus']['fair_value'], valuation['methods'],
+                          analyzer.data_version(), now, expires_at)
+
+    def stale_symbols(self, force=False):
+        """Các mã chưa có hoặc đã hết hạn giá trị hợp lý, trừ mã đang chờ thử lại sau lỗi"""
+        now = time.time()
+        stale = []
+        for symbol in self.symbols:
+            state = self.states.get(symbol)
+            if not force and state is not None and state.expires_at > now:
+                continue
+            failure = self._failures.get(symbol)
+            if not force and failure is not None and failure[0] > now:
+                continue
+            stale.append(symbol)
+        return stale
+
+    def _record_failure(self, symbol):
+        attempts = self._failures.get(symbol, (0, 0))[1] + 1
+        delay = min(self.retry_delay * 2 ** (attempts - 1), self.fair_value_ttl)
+        self._failures[symbol] = (time.time() + delay, attempts)
+
+    def _load(self, symbol):
+        if self._stop.is_set():
+            return None
+        try:
+            return self.load_components(symbol)
+        except Exception as e:
+            self.errors[symbol] = [str(e)]
+            return None
+
+    def refresh_components(self, force=False):
+        """Tải song song giá trị hợp lý cho các mã cần làm mới, trả về số mã tải thành công"""
+        futures = {self._executor.submit(self._load, symbol): symbol for symbol in self.stale_symbols(force)}
+        loaded = 0
+        pending = set(futures)
+        while pending and not self._stop.is_set():
+            # Chờ theo từng quãng ngắn để stop() không phải đợi các lần tải đang treo
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                loaded += self._store_components(futures[future], future.result())
+        for future in pending:
+            future.cancel()
+        return loaded
+
+    def _store_components(self, symbol, state):
+        if state is None:
+            self._record_failure(symbol)
+            return 0
+        self._failures.pop(symbol, None)
+        with self._lock:
+            previous = self.states.get(symbol)
+            if previous is not None:
+                state.price = previous.price
+                state.signal = previous.signal
+            self.states[symbol] = state
+        # Giá trị hợp lý đổi thì chênh lệch cũng đổi dù giá đứng yên
+        if state.price is not None:
+            self.apply_price(symbol, state.price, force=True)
+        return 1
+
+    def apply_price(self, symbol, price, force=False):
+        """Cập nhật giá cho một mã, trả về cảnh báo nếu đổi nhóm khuyến nghị"""
+        with self._lock:
+            state = self.states.get(symbol)
+            if state is None or price is None or price <= 0 or (price == state.price and not force):
+                return None
+
+            previous = state.signal
+            state.price = price
+            state.premium = (state.fair_value - price) / price * 100
+            state.updated_at = time.time()
+            recommendation, _, signal = get_recommendation(state.premium)
+            if previous is not None and signal != previous:
+                # Vùng chết quanh ngưỡng: nhóm mới phải đúng cả khi lệch chênh lệch ±hysteresis
+                lower = get_recommendation(state.premium - self.hysteresis)[2]
+                upper = get_recommendation(state.premium + self.hysteresis)[2]
+                if lower != signal or upper != signal:
+                    state.pending_signal, state.pending_ticks = None, 0
+                    return None
+                if signal != state.pending_signal:
+                    state.pending_signal, state.pending_ticks = signal, 0
+                state.pending_ticks += 1
+                if state.pending_ticks < self.confirm_ticks:
+                    return None
+            state.pending_signal, state.pending_ticks = None, 0
+            state.recommendation, state.signal = recommendation, signal
+            if previous is None or previous == state.signal:
+                return None
+            alert = {
+                'symbol': symbol,
+                'previous': previous,
+                'current': state.signal,
+                'recommendation': state.recommendation,
+                'price': price,
+                'premium': state.premium,
+                'fair_value': state.fair_value,
+            }
+
+        if self.on_alert is not None:
+            self.on_alert(alert)
+        return alert
+
+    def tick(self):
+        """Một nhịp làm mới: lấy giá mới nhất của các mã đã có giá trị hợp lý"""
+        symbols = list(self.states)
+        if not symbols:
+            return []
+        prices = self.price_feed(symbols, self.source)
+        alerts = []
+        for symbol, price in prices.items():
+            alert = self.apply_price(symbol, price)
+            if alert is not None:
+                alerts.append(alert)
+        return alerts
+
+    def snapshot(self):
+        with self._lock:
+            return [state.as_dict() for state in self.states.values()]
+
+    def _every_interval(self, step, description):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                step()
+            except Exception:
+                logger.exception("Lỗi khi %s", description)
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def run(self):
+        """Vòng lặp nền lấy giá mỗi interval giây"""
+        self._every_interval(self.tick, "làm mới giá danh mục theo dõi")
+
+    def run_components(self):
+        """Vòng lặp nền tải giá trị hợp lý cho mã mới, mã hết hạn và mã đến lượt thử lại"""
+        self._every_interval(self.refresh_components, "tải giá trị hợp lý")
+
+    def start(self):
+        if not any(thread.is_alive() for thread in self._threads):
+            if self._stop.is_set():
+                # Executor cũ đã bị shutdown trong stop()
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self.run_components, name='watchlist-components', daemon=True),
+                threading.Thread(target=self.run, name='watchlist-prices', daemon=True),
+            ]
+            for thread in self._threads:
+                thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Dừng các vòng lặp nền; không chờ các lần tải đang chạy dở (request vnstock không có timeout)"""
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        close = getattr(self.price_feed, 'close', None)
+        if close is not None:
+            close()
+        for thread in self._threads:
+            thread.join(timeout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="StockGuru - theo dõi danh mục và cảnh báo đổi khuyến nghị")
+    parser.add_argument('symbols', nargs='*', help="Danh sách mã cổ phiếu (ví dụ: FPT VNM HPG)")
+    parser.add_argument('--vn30', action='store_true', help="Theo dõi toàn bộ rổ VN30")
+    parser.add_argument('--source', default='TCBS', choices=['TCBS', 'VCI'], help="Nguồn dữ liệu")
+    parser.add_argument('--interval', type=float, default=60, help="Chu kỳ lấy giá (giây)")
+    parser.add_argument('--fair-value-ttl', type=float, default=6 * 3600,
+                        help="Thời gian giữ giá trị hợp lý trước khi tải lại báo cáo (giây)")
+    parser.add_argument('--demo', action='store_true', help="Dùng dữ liệu và giá giả lập thay cho vnstock")
+    args = parser.parse_args(argv)
+    symbols = args.symbols + (VN30_STOCKS if args.vn30 else [])
+    if not symbols:
+        parser.error("cần ít nhất một mã cổ phiếu hoặc --vn30")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    data_source = price_feed = None
+    if args.demo:
+        from demo_source import DemoDataSource, DemoPriceFeed
+        data_source = DemoDataSource()
+        price_feed = DemoPriceFeed(data_source)
+
+    def print_alert(alert):
+        sys.stdout.write(json.dumps(alert, ensure_ascii=False) + '\n')
+        sys.stdout.flush()
+
+    monitor = WatchlistMonitor(symbols, source=args.source, price_feed=price_feed, data_source=data_source,
+                               interval=args.interval, fair_value_ttl=args.fair_value_ttl,
+                               on_alert=print_alert)
+    monitor.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        monitor.stop()
+        # Luồng tải dở của executor sẽ bị join khi thoát nên thoát ngay thay vì chờ request treo
+        sys.stdout.flush()
+        os._exit(130)
+
+
+if __name__ == '__main__':
+    main()